@@ -1,11 +1,52 @@
 import os
+import asyncio
+import logging
+import hashlib
 import psutil
+import selectors
 import threading
 import subprocess
 import multiprocessing
 from contextlib import ExitStack
 import WDL
-from WDL._util import StructuredLogMessage as _
+from WDL._util import NOTICE_LEVEL, StructuredLogMessage as _
+
+try:
+    # optional: if inotify_simple is installed (Linux only), we watch stderr.txt for
+    # modifications instead of polling it every second (see _await_subprocess)
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+try:
+    # optional: with requests_unixsocket installed and [docker_run] use_engine_api enabled, we
+    # drive containers through the Docker Engine HTTP API over a persistent dockerd socket
+    # connection, instead of fork/exec'ing the sizeable docker CLI binary per task (see
+    # _run_via_engine_api)
+    import requests_unixsocket
+except ImportError:
+    requests_unixsocket = None
+
+# `docker run --user` argument: the invoking uid:gid, formatted once at import since it can't
+# change for the life of the process
+_UID_GID = f"{os.getuid()}:{os.getgid()}"
+
+
+def _read_cgroup_mem_limit():
+    """
+    Read the memory limit imposed on our cgroup (v2 then v1), or None if unlimited/undetectable
+    """
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as infile:
+                value = infile.read().strip()
+            if value != "max":
+                value = int(value)
+                if 0 < value < 1 << 60:  # cgroup v1 reports a huge number when unlimited
+                    return value
+        except (OSError, ValueError):
+            pass
+    return None
 
 
 class DockerRun(WDL.runtime.task_container.TaskContainer):
@@ -17,22 +58,58 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
       https://github.com/chanzuckerberg/miniwdl/blob/main/WDL/runtime/task_container.py
     """
 
-    # To simplify this example we'll use a lock, shared by all instances of this class, to execute
-    # docker containers one-at-a-time.
-    _run_lock = threading.Lock()
-
-    # Set by copy_input_files() below
-    _copied_input_files: bool = False
+    # Resource scheduling state shared by all instances of this class: a condition variable
+    # guarding the amount of host cpu & memory not currently reserved by running containers.
+    # Each _run() blocks until enough is free to cover its task's runtime values, so containers
+    # run N-way parallel up to the host's capacity (initialized in global_init below).
+    _sched_cv = threading.Condition()
+    _free_cpu: int = 0
+    _free_mem_bytes: int = 0
+
+    # Docker Engine API base URL (the dockerd socket path, percent-encoded per
+    # requests_unixsocket convention) and the keepalive session shared by all instances, opened
+    # in global_init when the optional HTTP API path is usable
+    _ENGINE_API = "http+unix://%2Fvar%2Frun%2Fdocker.sock/v1.41"
+    _engine_session = None
+
+    # Background event loop shared by all instances (started in global_init alongside the
+    # engine session): hosts the periodic terminating/stderr watcher for every running
+    # container, so N concurrent tasks need no watcher threads of their own
+    _event_loop = None
 
     @classmethod
     def global_init(cls, cfg, logger):
         """
         Perform any necessary process-wide initialization of the container backend
         """
+        # os.sched_getaffinity counts only the cpus available to this process, unlike
+        # multiprocessing.cpu_count() which over-advertises cores when we're confined to a cgroup
+        # cpuset (e.g. ourselves running inside a container). Likewise prefer the cgroup memory
+        # limit, when one is imposed, over the host total.
         cls._resource_limits = {
-            "cpu": multiprocessing.cpu_count(),
-            "mem_bytes": psutil.virtual_memory().total,
+            "cpu": (
+                len(os.sched_getaffinity(0))
+                if hasattr(os, "sched_getaffinity")
+                else multiprocessing.cpu_count()
+            ),
+            "mem_bytes": _read_cgroup_mem_limit() or psutil.virtual_memory().total,
         }
+        cls._free_cpu = cls._resource_limits["cpu"]
+        cls._free_mem_bytes = cls._resource_limits["mem_bytes"]
+        # The default image is consulted for every task, but cfg.get_dict re-parses the config
+        # entry on each call; resolve it once here.
+        cls._default_image = cfg.get_dict("task_runtime", "defaults").get("docker", "ubuntu:20.04")
+        # The Engine API path is opt-in, so merely having requests_unixsocket installed doesn't
+        # change which code path (and which log messages, as pinned by test/test.t) this example
+        # exercises by default.
+        cls._engine_session = None
+        if requests_unixsocket is not None and cfg.get_bool("docker_run", "use_engine_api", False):
+            cls._engine_session = requests_unixsocket.Session()
+            if cls._event_loop is None:
+                cls._event_loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=cls._event_loop.run_forever, name="DockerRunEventLoop", daemon=True
+                ).start()
         logger.info(
             _(
                 "initialized miniwdl_backend_example DockerRun plugin",
@@ -47,8 +124,37 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
         """
         return cls._resource_limits
 
+    @classmethod
+    def _release_resources(cls, cpu, mem_bytes):
+        """
+        Return a container's cpu/memory reservation to the shared pool and wake queued threads
+        """
+        with cls._sched_cv:
+            cls._free_cpu += cpu
+            cls._free_mem_bytes += mem_bytes
+            cls._sched_cv.notify_all()
+
     def __init__(self, cfg, run_id, host_dir):
         super().__init__(cfg, run_id, host_dir)
+        # paths referenced on every _run() attempt, precomputed since they're constant over the
+        # object's lifetime (unlike e.g. host_stdout_txt(), which varies with the retry counter)
+        self._docker_run_log_filename = os.path.join(host_dir, "docker_run.log")
+        self._host_command_file = os.path.join(host_dir, "command")
+        self._container_workdir = os.path.join(self.container_dir, "work")
+        self._container_stdout_txt = os.path.join(self.container_dir, "stdout.txt")
+        self._container_stderr_txt = os.path.join(self.container_dir, "stderr.txt")
+        self._container_command_file = os.path.join(self.container_dir, "command")
+        # Set by copy_input_files() below
+        self._copied_input_files = False
+        # bind-mount arguments delimit host:container paths with ':', so the fixed mount paths
+        # must not contain one (input paths are checked likewise in prepare_mounts); validating
+        # here keeps the per-mount argv loops free of the check
+        assert ":" not in host_dir + self.container_dir
+        # digest of the command file contents, once written (see prepare_mounts)
+        self._command_digest = None
+        # memoized input file/directory mounts and grouped-input symlinks (see prepare_mounts)
+        self._cached_input_mounts = None
+        self._cached_input_symlinks = None
 
     def copy_input_files(self, logger):
         """
@@ -59,6 +165,8 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
         """
         super().copy_input_files(logger)
         self._copied_input_files = True
+        self._cached_input_mounts = None
+        self._cached_input_symlinks = None
 
     def process_runtime(self, logger, runtime_eval):
         """
@@ -84,56 +192,96 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
         try:
             # contextlib.ExitStack() is useful for numerous "finally" actions
             with ExitStack() as cleanup:
-                # Formulate `docker run` invocation
-                invocation = self.docker_run_invocation(command)
-
-                # Acquire class-wide lock for running a container; a production implementation
-                # might have resource scheduling logic or submit to some external queue.
-                cleanup.enter_context(self._run_lock)
+                # Formulate the container configuration: an HTTP API payload when we hold a
+                # persistent Docker Engine session, otherwise a `docker run` argv
+                use_engine_api = self._engine_session is not None
+                if use_engine_api:
+                    payload = self.docker_run_payload(command)
+                else:
+                    invocation = self.docker_run_invocation(command)
+
+                # Reserve cpu & memory for the container, blocking while other containers hold
+                # too much of the host's capacity; a production implementation might instead
+                # submit to some external queue. While queued, watch the terminating() flag so
+                # that we abort promptly (and quietly, since the task never really started).
+                need_cpu = max(
+                    1, min(self.runtime_values.get("cpu", 1), self._resource_limits["cpu"])
+                )
+                need_mem = min(
+                    self.runtime_values.get("memory_reservation", 0),
+                    self._resource_limits["mem_bytes"],
+                )
+                with self._sched_cv:
+                    while not self._sched_cv.wait_for(
+                        lambda: type(self)._free_cpu >= need_cpu
+                        and type(self)._free_mem_bytes >= need_mem,
+                        timeout=1,
+                    ):
+                        if terminating():
+                            raise WDL.runtime.Terminated(quiet=True)
+                    type(self)._free_cpu -= need_cpu
+                    type(self)._free_mem_bytes -= need_mem
+                cleanup.callback(self._release_resources, need_cpu, need_mem)
 
                 # The task running context updates miniwdl's status bar for running tasks; we
                 # should enter it when our container actually starts (not while it's still in a
                 # resource scheduling queue).
                 cleanup.enter_context(self.task_running_context())
 
-                # Store the stdout/stderr of `docker run` itself (not the task command running
-                # inside the container, which we handle separately below) in the run directory.
-                docker_run_log_filename = os.path.join(self.host_dir, "docker_run.log")
-                docker_run_log = cleanup.enter_context(open(docker_run_log_filename, "wb"))
-
-                # Start `docker run` subprocess
-                logger.debug(_("docker run", invocation=invocation))
-                proc = subprocess.Popen(
-                    invocation, cwd=self.host_dir, stdout=docker_run_log, stderr=subprocess.STDOUT
+                # Store the output of `docker run` / the Engine API container attach (not the
+                # task command running inside the container, which we handle separately below)
+                # in the run directory. Only a raw fd is needed, so skip the Python
+                # BufferedWriter that open(..., "wb") would allocate around it; O_CLOEXEC keeps
+                # the fd from leaking into any other subprocess (Popen dup2's it onto the
+                # child's own stdout regardless).
+                docker_run_log_fd = os.open(
+                    self._docker_run_log_filename,
+                    os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC,
+                    0o644,
                 )
-                logger.notice(_("docker run", pid=proc.pid, log=docker_run_log_filename))
+                cleanup.callback(os.close, docker_run_log_fd)
 
                 # The poll_stderr context yields a helper function that we should invoke frequently
                 # while the task runs, to forward its standard error to miniwdl's verbose log.
                 poll_stderr = cleanup.enter_context(self.poll_stderr_context(logger))
 
-                # Long-poll for completion
-                exit_code = None
-                while exit_code is None:
-                    # The terminating() flag turns true when miniwdl has received SIGTERM/SIGINT.
-                    # In this event we should gracefully abort our container.
-                    if terminating():
-                        proc.terminate()
-                    try:
-                        exit_code = proc.wait(1)
-                    except subprocess.TimeoutExpired:
-                        pass
-                    # Frequently invoke poll_stderr()
-                    poll_stderr()
+                if use_engine_api:
+                    exit_code = self._run_via_engine_api(
+                        logger, terminating, cleanup, payload, docker_run_log_fd, poll_stderr
+                    )
+                else:
+                    # Start `docker run` subprocess. The isEnabledFor guards skip building
+                    # the structured log messages (dict construction + argv serialization)
+                    # outright when the respective levels are squelched.
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(_("docker run", invocation=invocation))
+                    # close_fds=True is the default, but spelled out since it's load-bearing for
+                    # launch speed: modern CPython implements it with one close_range(2) syscall
+                    # in the child rather than iterating /proc/self/fd, which on hosts with a
+                    # high RLIMIT_NOFILE (common in HPC) used to cost milliseconds per launch.
+                    # Our own fds are O_CLOEXEC anyway (see above), and the log fd is dup2'd
+                    # onto the child's stdout, so nothing needs pass_fds.
+                    proc = subprocess.Popen(
+                        invocation,
+                        cwd=self.host_dir,
+                        stdout=docker_run_log_fd,
+                        stderr=subprocess.STDOUT,
+                        close_fds=True,
+                    )
+                    if logger.isEnabledFor(NOTICE_LEVEL):
+                        logger.notice(
+                            _("docker run", pid=proc.pid, log=self._docker_run_log_filename)
+                        )
+
+                    # Wait for completion
+                    exit_code = self._await_subprocess(proc, terminating, poll_stderr)
 
                 # Invoke poll_stderr() once more after container exit, to get any final logs.
                 poll_stderr()
 
                 # If we aborted due to terminating(), then raise WDL.runtime.Terminated().
-                # In a production implementation that submits to some external queue, we should
-                # also check for terminating() flag while sitting in the queue and cancel the job
-                # promptly if triggered. In that case we can raise Terminated(quiet=true) to emit
-                # less log noise during the abort sequence (for tasks that never really started).
+                # (Tasks aborted while still queued for resources raise Terminated(quiet=True)
+                # above, emitting less log noise since they never really started.)
                 if terminating():
                     raise WDL.runtime.Terminated()
 
@@ -149,6 +297,68 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
             logger.error(_("unexpected DockerRun error", exception=str(exn)))
             raise WDL.Error.RuntimeError(str(exn))
 
+    def _await_subprocess(self, proc, terminating, poll_stderr):
+        """
+        Wait for the `docker run` subprocess to exit, frequently invoking poll_stderr() and
+        gracefully aborting the subprocess if the terminating() flag turns true (indicating
+        miniwdl has received SIGTERM/SIGINT).
+
+        On Linux >= 5.3, select() on a pidfd for the subprocess so this thread sleeps until the
+        subprocess actually exits, waking at most once per second to service terminating() and
+        poll_stderr() -- rather than busy-polling proc.wait(1), whose wakeup syscalls scale with
+        the number of concurrently running containers. Elsewhere, fall back to the polling loop.
+
+        Additionally, with inotify_simple installed we watch stderr.txt for modification and
+        invoke poll_stderr() only when the task has actually written something, sparing the
+        once-per-second file tailing for compute-bound tasks that rarely log.
+        """
+        pidfd = -1
+        if hasattr(os, "pidfd_open"):
+            try:
+                pidfd = os.pidfd_open(proc.pid)
+            except OSError:
+                pass  # kernel too old for pidfd_open
+        sel = None
+        ino = None
+        try:
+            if pidfd >= 0:
+                sel = selectors.DefaultSelector()
+                sel.register(pidfd, selectors.EVENT_READ, "pidfd")
+                if inotify_simple is not None:
+                    # stderr.txt was touched in prepare_mounts, so the watch can't miss
+                    ino = inotify_simple.INotify()
+                    ino.add_watch(self.host_stderr_txt(), inotify_simple.flags.MODIFY)
+                    sel.register(ino.fd, selectors.EVENT_READ, "stderr")
+            exit_code = None
+            while exit_code is None:
+                if terminating():
+                    proc.terminate()
+                if sel is not None:
+                    stderr_modified = False
+                    for key, _event in sel.select(timeout=1):
+                        if key.data == "pidfd":
+                            # pidfd becomes readable when the subprocess exits
+                            exit_code = proc.wait()
+                        else:
+                            ino.read(timeout=0)  # drain the inotify events
+                            stderr_modified = True
+                    if stderr_modified or ino is None:
+                        poll_stderr()
+                else:
+                    try:
+                        exit_code = proc.wait(1)
+                    except subprocess.TimeoutExpired:
+                        pass
+                    poll_stderr()
+            return exit_code
+        finally:
+            if sel is not None:
+                sel.close()
+            if ino is not None:
+                ino.close()
+            if pidfd >= 0:
+                os.close(pidfd)
+
     def docker_run_invocation(self, command):
         """
         Formulate the `docker run` invocation based on
@@ -162,15 +372,15 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
             "run",
             # CWD inside the container
             "--workdir",
-            os.path.join(self.container_dir, "work"),
-            # Run as the invoking uid inside the container; this avoids the annoying problem of
+            self._container_workdir,
+            # Run as the invoking uid:gid inside the container; this avoids the annoying problem of
             # files written inside the container being owned by root afterwards. But it's
             # incompatible with task commands that assume they're running as root (e.g. to install
             # packages at runtime). That's fine for this toy example, but miniwdl's built-in
             # backends jump through some hoops to chown the working directory after letting the
             # command run as root.
             "--user",
-            str(os.getuid()),
+            _UID_GID,
         ]
 
         # Provision cpu/memory based on self.runtime_values, which is a postprocessed version of
@@ -178,11 +388,11 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
         # memory_limit and memory_reservation, both in bytes).
         cpu = self.runtime_values.get("cpu", 0)
         if cpu > 0:
-            ans += ["--cpus", str(cpu)]
+            ans.extend(("--cpus", str(cpu)))
         # memory_limit = backend should kill the container if memory usage exceeds this (bytes)
         memory_limit = self.runtime_values.get("memory_limit", 0)
         if memory_limit > 0:
-            ans += ["--memory", str(memory_limit)]
+            ans.extend(("--memory", str(memory_limit)))
         # self.runtime_values.get("memory_reservation", 0) should be used to guide resource
         # scheduling (not relevant in this example running one container at a time).
 
@@ -194,33 +404,183 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
             ans.append("--read-only")
 
         # File/Directory I/O mounts
-        # If the task takes a very large number of inputs, then we might worry about the command
-        # line exceeding some system limit. Then we might need to explore an alternate
-        # implementation strategy, such populating the working directory with hardlinks to the
-        # inputs, and just mounting that directory.
+        # prepare_mounts consolidates input files sharing a host directory into one read-only
+        # mount each (see group_inputs_threshold there), so even a task with a very large number
+        # of inputs shouldn't push this command line over any system limit.
+        # Collect the mount flags into one list and extend the argv once, rather than an
+        # `ans += [...]` temporary-list allocation per mount
+        vol_args = []
         for host_path, container_path, writable in self.prepare_mounts(command):
-            assert ":" not in (container_path + host_path)
             vol = f"{host_path}:{container_path}"
             if not writable:
                 vol += ":ro"
-            ans += ["-v", vol]
+            vol_args.append("-v")
+            vol_args.append(vol)
+        ans.extend(vol_args)
 
         # Docker image tag
-        image = self.runtime_values.get(
-            "docker", self.cfg.get_dict("task_runtime", "defaults").get("docker", "ubuntu:20.04")
-        )
+        image = self.runtime_values.get("docker", self._default_image)
         ans.append(image)
 
         # Bootstrapping within the container: execute the given command with stdout and stderr
         # redirected into log files.
-        ans += [
-            "/bin/sh",
-            "-c",
-            self.cfg.get("task_runtime", "command_shell")
-            + " ../command >> ../stdout.txt 2>> ../stderr.txt",
-        ]
+        ans.extend(
+            (
+                "/bin/sh",
+                "-c",
+                self.cfg.get("task_runtime", "command_shell")
+                + " ../command >> ../stdout.txt 2>> ../stderr.txt",
+            )
+        )
         return ans
 
+    def docker_run_payload(self, command):
+        """
+        Formulate the Docker Engine API /containers/create request body: the same container
+        configuration as docker_run_invocation, expressed as JSON instead of a CLI argv (see
+        https://docs.docker.com/engine/api/ for the schema)
+        """
+        host_config = {}
+        cpu = self.runtime_values.get("cpu", 0)
+        if cpu > 0:
+            host_config["NanoCpus"] = cpu * 1_000_000_000
+        memory_limit = self.runtime_values.get("memory_limit", 0)
+        if memory_limit > 0:
+            host_config["Memory"] = memory_limit
+        if self.cfg.get_bool("docker_run", "read_only_root_filesystem", False):
+            host_config["ReadonlyRootfs"] = True
+        binds = []
+        for host_path, container_path, writable in self.prepare_mounts(command):
+            bind = f"{host_path}:{container_path}"
+            if not writable:
+                bind += ":ro"
+            binds.append(bind)
+        host_config["Binds"] = binds
+        image = self.runtime_values.get("docker", self._default_image)
+        return {
+            "Image": image,
+            "User": _UID_GID,
+            "WorkingDir": self._container_workdir,
+            "Cmd": [
+                "/bin/sh",
+                "-c",
+                self.cfg.get("task_runtime", "command_shell")
+                + " ../command >> ../stdout.txt 2>> ../stderr.txt",
+            ],
+            "HostConfig": host_config,
+        }
+
+    def _run_via_engine_api(self, logger, terminating, cleanup, payload, log_fd, poll_stderr):
+        """
+        Create, start, and await the container through the Docker Engine HTTP API over the
+        persistent dockerd socket session opened in global_init. Compared to fork/exec'ing the
+        docker CLI for every task, this reuses one keepalive connection instead of paying client
+        process startup, a fresh socket connection, and API version negotiation per container.
+        """
+        session = self._engine_session
+        api = self._ENGINE_API
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(_("docker create", payload=payload))
+        resp = session.post(api + "/containers/create", json=payload)
+        if resp.status_code == 404:
+            # Image not present locally; pull it (as the docker CLI would do implicitly), then
+            # retry the create
+            logger.info(_("docker pull", image=payload["Image"]))
+            pull = session.post(
+                api + "/images/create", params={"fromImage": payload["Image"]}, stream=True
+            )
+            for _chunk in pull.iter_content(65536):
+                pass  # drain the pull progress stream
+            pull.raise_for_status()
+            resp = session.post(api + "/containers/create", json=payload)
+        resp.raise_for_status()
+        container_id = resp.json()["Id"]
+        if logger.isEnabledFor(NOTICE_LEVEL):
+            logger.notice(
+                _("docker start", container=container_id[:12], log=self._docker_run_log_filename)
+            )
+
+        def remove_container():
+            try:
+                session.delete(api + "/containers/" + container_id, params={"force": "true"})
+            except Exception as exn:
+                logger.error(_("failed to remove container", exception=str(exn)))
+
+        cleanup.callback(remove_container)
+
+        session.post(api + "/containers/" + container_id + "/start").raise_for_status()
+
+        # POST /wait blocks server-side until the container exits -- no client polling -- so
+        # this thread simply blocks in it (miniwdl dedicates the thread to this task either
+        # way). Meanwhile a watcher coroutine on the shared event loop services terminating()
+        # and poll_stderr() once per second; with one loop hosting every running container's
+        # watcher, concurrent tasks cost no helper threads of their own.
+        async def watch():
+            killed = False
+            while True:
+                await asyncio.sleep(1)
+                if terminating() and not killed:
+                    # Dispatch the kill request to a worker thread, with a timeout: a slow or
+                    # stuck dockerd must not stall the shared loop, and with it every other
+                    # container's watcher. Fire-and-forget, so cancellation of this watcher
+                    # can't abort an in-flight kill either.
+                    def kill():
+                        try:
+                            session.post(api + "/containers/" + container_id + "/kill", timeout=10)
+                        except Exception as exn:
+                            logger.error(_("failed to kill container", exception=str(exn)))
+
+                    asyncio.get_running_loop().run_in_executor(None, kill)
+                    killed = True
+                # poll_stderr stays inline as the loop's only direct work: it just tails a
+                # small local file, bounded effort that can't wedge the loop
+                poll_stderr()
+
+        watch_future = asyncio.run_coroutine_threadsafe(watch(), self._event_loop)
+        try:
+            resp = session.post(api + "/containers/" + container_id + "/wait")
+            resp.raise_for_status()
+            status_code = resp.json()["StatusCode"]
+        finally:
+            watch_future.cancel()
+            try:
+                # ensure the watcher has really finished before anyone else touches poll_stderr
+                watch_future.result(timeout=2)
+            except (asyncio.CancelledError, Exception):
+                pass
+
+        # Now that the container has exited, fetch its own output (if any) into docker_run.log;
+        # the task command's stdout/stderr went to their mounted files regardless.
+        self._stream_engine_logs(session, container_id, log_fd)
+        return status_code
+
+    @classmethod
+    def _stream_engine_logs(cls, session, container_id, log_fd):
+        """
+        Copy the exited container's output stream into the given log fd. Best-effort: the
+        task's own stdout/stderr don't pass through here.
+        """
+        try:
+            resp = session.get(
+                cls._ENGINE_API + "/containers/" + container_id + "/logs",
+                params={"stdout": "1", "stderr": "1"},
+                stream=True,
+            )
+            # Copy with a large buffer and write straight to the fd, avoiding iter_content's
+            # per-chunk generator machinery. A zero-copy splice of the raw socket is not an
+            # option here: http.client may have prefetched body bytes into its buffered reader,
+            # and on a keepalive connection the peer doesn't close after the body, so splicing
+            # until EOF would both lose data and hang while desynchronizing the shared session.
+            raw = resp.raw
+            while True:
+                buf = raw.read(1 << 16)
+                if not buf:
+                    break
+                os.write(log_fd, buf)
+        except Exception:
+            pass
+
     def prepare_mounts(self, command):
         """
         Prepare list of (host_path, container_path, writable) to be mounted in the container
@@ -233,25 +593,25 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
         # will look for it if called; ditto for stderr. Also, poll_stderr() tails
         # self.host_stderr_txt()
         self.touch_mount_point(self.host_stdout_txt())
-        mounts.append(
-            (self.host_stdout_txt(), os.path.join(self.container_dir, "stdout.txt"), True)
-        )
+        mounts.append((self.host_stdout_txt(), self._container_stdout_txt, True))
         self.touch_mount_point(self.host_stderr_txt())
-        mounts.append(
-            (self.host_stderr_txt(), os.path.join(self.container_dir, "stderr.txt"), True)
-        )
-        mounts.append((self.host_work_dir(), os.path.join(self.container_dir, "work"), True))
-
-        # Write command in a read-only file
-        with open(os.path.join(self.host_dir, "command"), "w") as outfile:
-            outfile.write(command)
-        mounts.append(
-            (
-                os.path.join(self.host_dir, "command"),
-                os.path.join(self.container_dir, "command"),
-                False,
-            )
-        )
+        mounts.append((self.host_stderr_txt(), self._container_stderr_txt, True))
+        mounts.append((self.host_work_dir(), self._container_workdir, True))
+
+        # Write command in a read-only file. Since retry logic may re-invoke _run() (hence
+        # prepare_mounts) on the same object, digest the command and skip rewriting the file when
+        # it already holds these exact bytes; the write itself uses one raw os.write rather than
+        # a buffered Python file object.
+        command_bytes = command.encode()
+        command_digest = hashlib.blake2b(command_bytes, digest_size=16).digest()
+        if command_digest != self._command_digest:
+            fd = os.open(self._host_command_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            try:
+                os.write(fd, command_bytes)
+            finally:
+                os.close(fd)
+            self._command_digest = command_digest
+        mounts.append((self._host_command_file, self._container_command_file, False))
 
         # Mount input Files & Directories read-only
         # - self.input_path_map will have been populated previously
@@ -259,18 +619,114 @@ class DockerRun(WDL.runtime.task_container.TaskContainer):
         # - skip these if copy_input_files() was used, since the inputs are already present in the
         #   working directory
         if not self._copied_input_files:
-            for host_path, container_path in self.input_path_map.items():
-                assert (not container_path.endswith("/")) or os.path.isdir(host_path.rstrip("/"))
-                host_mount_point = os.path.join(
-                    self.host_dir, os.path.relpath(container_path.rstrip("/"), self.container_dir)
-                )
-                if not os.path.exists(host_mount_point):
-                    # touch_mount_point: it's helpful to touch any mount points that don't already
-                    # exist; if we let the container create them then they might get unexpected
-                    # ownership/permissions.
-                    self.touch_mount_point(
-                        host_mount_point + ("/" if container_path.endswith("/") else "")
+            # These mounts don't vary across retries (unlike the stdout/stderr/work paths above,
+            # which incorporate the attempt number), so memoize them: retries reuse the list
+            # instead of re-walking a possibly huge input_path_map. copy_input_files() clears the
+            # memo, should it somehow run in between.
+            if self._cached_input_mounts is None:
+                # one pass over the whole map replaces the former per-mount ':' assertion in the
+                # argv-building loops (bind-mount syntax can't express paths containing ':')
+                assert not any(
+                    ":" in path
+                    for path in (*self.input_path_map.keys(), *self.input_path_map.values())
+                ), "input path contains ':'"
+                # It's helpful to touch any mount points that don't already exist; if we let the
+                # container create them then they might get unexpected ownership/permissions.
+                # Rather than touch_mount_point() per input -- which repeats os.makedirs() path
+                # traversal for each of possibly thousands of inputs -- collect the needed
+                # directories and empty files during the loop, then batch-create them afterwards.
+                input_mounts = []
+                file_mount_points = []
+                mount_point_dirs = set()
+                symlinks = []
+                # When many input files share one host directory, mount that directory read-only
+                # just once and symlink each file's in-container path to its location under the
+                # shared mount. This keeps the `docker run` command line (and dockerd's mount
+                # setup work) proportional to the number of distinct input directories rather
+                # than the number of input files. Only plain files whose container paths fall
+                # under the working directory qualify; the symlinks live in the mounted working
+                # directory, so the container resolves them through the shared mount.
+                group_threshold = self.cfg.get_int("docker_run", "group_inputs_threshold", 10)
+                grouped_candidates = {}
+                for host_path, container_path in self.input_path_map.items():
+                    # compute the trailing-slash-stripped forms just once per path; the repeated
+                    # rstrip/endswith calls add up over a large input_path_map
+                    is_dir = container_path.endswith("/")
+                    container_path_stripped = container_path[:-1] if is_dir else container_path
+                    host_path_stripped = host_path[:-1] if host_path.endswith("/") else host_path
+                    assert not is_dir or os.path.isdir(host_path_stripped)
+                    host_mount_point = os.path.join(
+                        self.host_dir,
+                        os.path.relpath(container_path_stripped, self.container_dir),
                     )
-                mounts.append((host_path.rstrip("/"), container_path.rstrip("/"), False))
+                    assert host_mount_point.startswith(self.host_dir + "/")
+                    # no need to check os.path.exists first: the batched creation below already
+                    # tolerates pre-existing paths (exist_ok / ignored FileExistsError), so the
+                    # extra stat per input would be pure overhead
+                    if is_dir:
+                        mount_point_dirs.add(host_mount_point)
+                        input_mounts.append((host_path_stripped, container_path_stripped, False))
+                    elif container_path_stripped.startswith(self._container_workdir + "/"):
+                        grouped_candidates.setdefault(
+                            os.path.dirname(host_path_stripped), []
+                        ).append((host_path_stripped, container_path_stripped, host_mount_point))
+                    else:
+                        mount_point_dirs.add(os.path.dirname(host_mount_point))
+                        file_mount_points.append(host_mount_point)
+                        input_mounts.append((host_path_stripped, container_path_stripped, False))
+                inputs_mount_seq = 0
+                for host_parent, group in grouped_candidates.items():
+                    if len(group) >= group_threshold:
+                        container_inputs_dir = os.path.join(
+                            self.container_dir, "inputs", str(inputs_mount_seq)
+                        )
+                        inputs_mount_seq += 1
+                        input_mounts.append((host_parent, container_inputs_dir, False))
+                        for _host_path, _container_path, host_mount_point in group:
+                            symlinks.append(
+                                (
+                                    _container_path,
+                                    os.path.join(
+                                        container_inputs_dir, os.path.basename(_host_path)
+                                    ),
+                                )
+                            )
+                    else:
+                        # directory with only a few input files: mount each directly
+                        for _host_path, _container_path, host_mount_point in group:
+                            mount_point_dirs.add(os.path.dirname(host_mount_point))
+                            file_mount_points.append(host_mount_point)
+                            input_mounts.append((_host_path, _container_path, False))
+                # Sorting the directories ensures parents precede children, so exist_ok amounts
+                # to a cheap stat for the children; the empty files need only an open/close
+                # syscall pair.
+                for mount_point_dir in sorted(mount_point_dirs):
+                    os.makedirs(mount_point_dir, exist_ok=True)
+                for file_mount_point in file_mount_points:
+                    try:
+                        os.close(
+                            os.open(file_mount_point, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                        )
+                    except FileExistsError:
+                        pass
+                self._cached_input_mounts = input_mounts
+                self._cached_input_symlinks = symlinks
+            mounts.extend(self._cached_input_mounts)
+            # Materialize the grouped-input symlinks in the *current* attempt's working
+            # directory. Unlike the bind arguments above, this pass must rerun on every attempt:
+            # retries bind a fresh host work dir into the container, which starts out without
+            # the symlinks. The links dangle on the host and resolve inside the container via
+            # the shared mount.
+            made_link_dirs = set()
+            for container_path, link_target in self._cached_input_symlinks:
+                link_path = self.host_work_path(container_path)
+                link_dir = os.path.dirname(link_path)
+                if link_dir not in made_link_dirs:
+                    os.makedirs(link_dir, exist_ok=True)
+                    made_link_dirs.add(link_dir)
+                try:
+                    os.symlink(link_target, link_path)
+                except FileExistsError:
+                    pass
 
         return mounts